@@ -0,0 +1,156 @@
+from flask import (current_app, request, session, abort,
+                   make_response, send_from_directory, url_for)
+from werkzeug.security import safe_join
+from collections import OrderedDict
+import brotli, gzip, hashlib, json, mimetypes, os, threading
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+ASSET_EXTENSIONS = ('.css', '.js', '.svg')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# ─────────────────────────────────────────
+# RENDER CACHE
+# ─────────────────────────────────────────
+
+class RenderCache:
+    """Thread-safe LRU of rendered HTML, shared by all requests in the process."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        if not current_app.config.get('RENDER_CACHE', True):
+            return render()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = render()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+page_cache = RenderCache(max_entries=64)
+fragment_cache = RenderCache(max_entries=2048)
+
+def cached_page(render):
+    # Static pages only vary by the navbar, which depends on who is logged in.
+    key = (request.endpoint, bool(session.get('user_id')), bool(session.get('is_doctor')))
+    refresh_manifest()
+
+    def render_entry():
+        body = render().encode('utf-8')
+        return body, gzip.compress(body, compresslevel=6)
+
+    body, gzipped = page_cache.get_or_render(key, render_entry)
+    if request.accept_encodings['gzip']:
+        response = make_response(gzipped)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = make_response(body)
+    response.vary.add('Accept-Encoding')
+    return response
+
+# ─────────────────────────────────────────
+# FINGERPRINTED STATIC ASSETS
+# ─────────────────────────────────────────
+
+_manifest = {}
+_manifest_mtime = None
+
+def _write_bytes(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def build_assets():
+    os.makedirs(DIST_DIR, exist_ok=True)
+    manifest = {}
+    for name in sorted(os.listdir(STATIC_DIR)):
+        src = os.path.join(STATIC_DIR, name)
+        if not (os.path.isfile(src) and name.endswith(ASSET_EXTENSIONS)):
+            continue
+        with open(src, 'rb') as f:
+            data = f.read()
+        stem, ext = os.path.splitext(name)
+        hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        dest = os.path.join(DIST_DIR, hashed)
+        _write_bytes(dest, data)
+        _write_bytes(dest + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        _write_bytes(dest + '.br', brotli.compress(data, quality=11))
+        manifest[name] = hashed
+    # Files from the previous build stay for one more build, so servers and
+    # clients still holding HTML that links them keep getting the stylesheet.
+    keep = {os.path.basename(MANIFEST_PATH)}
+    for hashed in list(_read_manifest().values()) + list(manifest.values()):
+        keep.update((hashed, hashed + '.gz', hashed + '.br'))
+    # Replace atomically so a running server never reads a half-written file.
+    with open(MANIFEST_PATH + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(MANIFEST_PATH + '.tmp', MANIFEST_PATH)
+    for name in os.listdir(DIST_DIR):
+        if name not in keep:
+            os.remove(os.path.join(DIST_DIR, name))
+    refresh_manifest()
+    return manifest
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def load_manifest():
+    global _manifest_mtime
+    try:
+        _manifest_mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except OSError:
+        _manifest_mtime = None
+    manifest = _read_manifest()
+    _manifest.clear()
+    _manifest.update(manifest)
+
+def refresh_manifest():
+    # build-assets may run in another process; pick up its manifest and drop
+    # cached pages that embed the old asset URLs.
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except OSError:
+        mtime = None
+    if mtime != _manifest_mtime:
+        load_manifest()
+        page_cache.clear()
+
+def asset_url(filename):
+    refresh_manifest()
+    hashed = _manifest.get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('hashed_asset', filename=hashed)
+
+def send_hashed_asset(filename):
+    # Anything still in dist/ is servable, including the previous build's files.
+    if not filename.endswith(ASSET_EXTENSIONS) or safe_join(DIST_DIR, filename) is None:
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if (request.accept_encodings[encoding]
+                and os.path.isfile(os.path.join(DIST_DIR, filename + suffix))):
+            response = send_from_directory(DIST_DIR, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(DIST_DIR, filename, mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
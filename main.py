@@ -1,14 +1,20 @@
 from flask import (Flask, render_template, request,
                    jsonify, session, redirect, url_for, send_file)
+from markupsafe import Markup
 from models import db, User, Medication, Event, BPLog, DemoRequest, get_moscow_now
+from delivery import (cached_page, fragment_cache, build_assets, load_manifest,
+                      asset_url, send_hashed_asset)
 from datetime import datetime, timedelta, timezone
-import json, io, os
+import click, json, io, os
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'neurokeep-demo-2026-secret')
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///neurokeep.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['RENDER_CACHE'] = os.environ.get('RENDER_CACHE', '1') == '1'
 db.init_app(app)
+load_manifest()
+app.jinja_env.globals['asset_url'] = asset_url
 
 # ─────────────────────────────────────────
 # HELPERS
@@ -82,6 +88,17 @@ def calc_streak(user_id):
             break
     return streak
 
+def get_dose_data_version(user_id):
+    # Changes whenever a dose is confirmed or a medication is added/removed,
+    # which is everything the dashboard fragments are computed from.
+    doses = db.session.query(db.func.count(Event.id), db.func.max(Event.id)).filter(
+        Event.user_id == user_id,
+        Event.event_type == 'dose_confirmed'
+    ).one()
+    meds = db.session.query(db.func.count(Medication.id), db.func.max(Medication.id))\
+        .filter(Medication.user_id == user_id).one()
+    return tuple(doses) + tuple(meds)
+
 def is_within_window(window_start, window_end):
     now = get_moscow_now().strftime('%H:%M')
     return window_start <= now <= window_end
@@ -100,7 +117,7 @@ def get_risk_level(adherence_pct, last_bp_sys):
 
 @app.route('/')
 def landing():
-    return render_template('landing.html')
+    return cached_page(lambda: render_template('landing.html'))
 
 @app.route('/logout')
 def logout():
@@ -147,7 +164,7 @@ def onboarding_1():
                     'window': w
                 })
         return redirect(url_for('onboarding_2'))
-    return render_template('onboarding_1.html', time_windows=TIME_WINDOWS)
+    return cached_page(lambda: render_template('onboarding_1.html', time_windows=TIME_WINDOWS))
 
 @app.route('/onboarding/2', methods=['GET', 'POST'])
 def onboarding_2():
@@ -158,7 +175,7 @@ def onboarding_2():
             return redirect(url_for('onboarding_3'))
         except ValueError:
             return render_template('onboarding_2.html', error="Неверный формат чисел")
-    return render_template('onboarding_2.html')
+    return cached_page(lambda: render_template('onboarding_2.html'))
 
 @app.route('/onboarding/3', methods=['GET', 'POST'])
 def onboarding_3():
@@ -207,8 +224,9 @@ def onboarding_3():
         except Exception as err:
             error = "Ошибка создания профиля"
             db.session.rollback()
+        return render_template('onboarding_3.html', error=error)
 
-    return render_template('onboarding_3.html', error=error)
+    return cached_page(lambda: render_template('onboarding_3.html'))
 
 # ─────────────────────────────────────────
 # SECTION C: PATIENT DASHBOARD
@@ -222,31 +240,43 @@ def dashboard():
     user = db.session.get(User, user_id)
     meds = Medication.query.filter_by(user_id=user_id).all()
     today = get_moscow_now().date()
+    version = (user_id, str(today), get_dose_data_version(user_id))
+    in_window = tuple(is_within_window(m.window_start, m.window_end) for m in meds)
 
-    confirmed_today = set()
-    for e in Event.query.filter(
-        Event.user_id == user_id,
-        Event.event_type == 'dose_confirmed',
-        db.func.date(Event.timestamp) == today
-    ).all():
-        if e.medication_id:
-            confirmed_today.add(e.medication_id)
-
-    for med in meds:
-        med.in_window = is_within_window(med.window_start, med.window_end)
-        med.confirmed_today = med.id in confirmed_today
-
-    streak = calc_streak(user_id)
-    adherence_data = get_adherence_last_n_days(user_id, 7)
-    adherence_pct = round(
-        sum(1 for d in adherence_data if d['taken'] >= d['total'] and d['total'] > 0)
-        / max(len(adherence_data), 1) * 100
-    )
+    def render_med_cards():
+        confirmed_today = set()
+        for e in Event.query.filter(
+            Event.user_id == user_id,
+            Event.event_type == 'dose_confirmed',
+            db.func.date(Event.timestamp) == today
+        ).all():
+            if e.medication_id:
+                confirmed_today.add(e.medication_id)
+
+        for med, med_in_window in zip(meds, in_window):
+            med.in_window = med_in_window
+            med.confirmed_today = med.id in confirmed_today
+        return Markup(render_template('_medication_cards.html', meds=meds))
+
+    def render_adherence():
+        adherence_data = get_adherence_last_n_days(user_id, 7)
+        adherence_pct = round(
+            sum(1 for d in adherence_data if d['taken'] >= d['total'] and d['total'] > 0)
+            / max(len(adherence_data), 1) * 100
+        )
+        return {
+            'streak': calc_streak(user_id),
+            'html': Markup(render_template('_adherence_chart.html',
+                adherence_data=adherence_data, adherence_pct=adherence_pct))
+        }
+
+    med_cards = fragment_cache.get_or_render(('med_cards', version, in_window), render_med_cards)
+    adherence = fragment_cache.get_or_render(('adherence', version), render_adherence)
 
     log_event(user_id, 'dashboard_opened')
     return render_template('dashboard.html',
-        user=user, meds=meds, streak=streak,
-        adherence_data=adherence_data, adherence_pct=adherence_pct
+        user=user, meds=meds, streak=adherence['streak'],
+        med_cards=med_cards, adherence_chart=adherence['html']
     )
 
 @app.route('/confirm_dose/<int:med_id>', methods=['POST'])
@@ -509,6 +539,19 @@ def api_events_latest():
         'metadata': e.metadata_json
     } for e in events])
 
+# ─────────────────────────────────────────
+# SECTION H: STATIC ASSETS
+# ─────────────────────────────────────────
+
+@app.route('/assets/<path:filename>')
+def hashed_asset(filename):
+    return send_hashed_asset(filename)
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    for name, hashed in build_assets().items():
+        click.echo(f"{name} -> dist/{hashed}")
+
 # ─────────────────────────────────────────
 # DEMO DATA SEED
 # ─────────────────────────────────────────
@@ -528,4 +571,5 @@ def seed_demo():
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        build_assets()
     app.run(host='0.0.0.0', port=8080, debug=False)
\ No newline at end of file